@@ -1,8 +1,14 @@
 import os
-import time
+import re
 import json
+import platform
+import subprocess
+import threading
+import atexit
 import asyncio
 import logging
+from logging.handlers import RotatingFileHandler
+import requests
 from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -16,12 +22,12 @@ from dotenv import load_dotenv
 import discord
 from discord.ext import tasks
 
-# Configure logging
+# Configure logging, rotating the log file so it stays bounded when running 24/7
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.FileHandler('icbc_checker.log'),
+        RotatingFileHandler('icbc_checker.log', maxBytes=5_000_000, backupCount=3, encoding='utf-8'),
         logging.StreamHandler()
     ]
 )
@@ -60,61 +66,244 @@ if not DISCORD_CHANNEL_ID:
 try:
     DISCORD_CHANNEL_ID = int(DISCORD_CHANNEL_ID)
 except ValueError:
-    logger.error(f"DISCORD_CHANNEL_ID must be a number, got: {DISCORD_CHANNEL_ID}")
+    logger.error("DISCORD_CHANNEL_ID must be a number, got: %s", DISCORD_CHANNEL_ID)
     exit(1)
 
+# ICBC booking API settings; the browser is only used when no office ID is set.
+# ICBC_POS_ID may list several comma-separated offices to check in parallel.
+ICBC_POS_IDS = [pos_id.strip() for pos_id in os.getenv('ICBC_POS_ID', '').split(',') if pos_id.strip()]
+ICBC_EXAM_TYPE = os.getenv('ICBC_EXAM_TYPE', '7-R-1')
+
+# Office searched for by the browser check; with a single ICBC_POS_ID it must be the same office
+ICBC_LOCATION_NAME = os.getenv('ICBC_LOCATION_NAME', 'Richmond driver licensing (Lansdowne Centre mall)')
+if len(ICBC_POS_IDS) > 1:
+    LOCATION_LABEL = "offices " + ", ".join(ICBC_POS_IDS)
+else:
+    LOCATION_LABEL = ICBC_LOCATION_NAME
+
+# Optional Chrome remote debugging port, lets extra checkers share one browser
+CHROME_DEBUG_PORT = os.getenv('CHROME_DEBUG_PORT')
+
 # Check interval in minutes
 CHECK_INTERVAL = int(os.getenv('CHECK_INTERVAL_MINUTES', '5'))
 MAX_RETRIES = 3
 RETRY_DELAY = 60  # seconds
+CHECK_TIMEOUT = 120  # seconds
+BROWSER_RECYCLE_AFTER = int(os.getenv('BROWSER_RECYCLE_AFTER', '100'))  # browser checks
 
 # Initialize Discord client
 intents = discord.Intents.default()
 client = discord.Client(intents=intents)
 
-# Store previously found appointments to avoid duplicate notifications
-previous_appointments = set()
+# Store previously found appointments to avoid duplicate notifications,
+# persisted to disk so a restart doesn't re-announce them
+previous_appointments = frozenset()
+STATE_FILE = 'state.json'
+
+# Persistent checker reused across checks, created once in on_ready
+checker = None
+
+# Discord channel for notifications, resolved once in on_ready
+channel = None
+
+# Resolved ChromeDriver path, taken from CHROMEDRIVER_PATH or cached after the first install
+driver_path = os.getenv('CHROMEDRIVER_PATH')
+
+LOGIN_URL = 'https://onlinebusiness.icbc.com/webdeas-ui/login;type=driver'
+BOOKING_URL = 'https://onlinebusiness.icbc.com/webdeas-ui/booking'
+API_LOGIN_URL = 'https://onlinebusiness.icbc.com/deas-api/v1/webLogin/webLogin'
+API_APPOINTMENTS_URL = 'https://onlinebusiness.icbc.com/deas-api/v1/web/getAvailableAppointments'
+
+# Discord message templates
+NEW_TMPL = (
+    "🚨 **New ICBC Road Test Appointments Available!**\n\n"
+    "{body}\n\n"
+    f"Book now at: {BOOKING_URL}"
+)
+NO_APPT_TMPL = (
+    "⚠️ **ICBC Appointment Check Update** - {time}\n\n"
+    "No appointments currently available at {location}.\n"
+    "I'll keep checking and notify you when appointments become available."
+)
+EXISTING_TMPL = (
+    "ℹ️ **ICBC Appointment Check Update** - {time}\n\n"
+    "Currently available appointments:\n"
+    "{body}\n\n"
+    "No new appointments since last check."
+)
+ERROR_TMPL = (
+    "❌ **ICBC Checker Error** - {time}\n\n"
+    "Failed to check appointments.\n"
+    "I'll try again in the next scheduled check."
+)
+OFFICE_ERROR_TMPL = (
+    "❌ **ICBC Checker Error** - {time}\n\n"
+    "Failed to check {offices}.\n"
+    "I'll try again in the next scheduled check."
+)
+
+def office_suffix(pos_id):
+    return f" (office {pos_id})"
+
+# Formats seen for appointment dates and times in the API and on the booking page
+APPOINTMENT_DATE_FORMATS = ('%Y-%m-%d', '%A, %B %d, %Y', '%B %d, %Y', '%a, %b %d, %Y', '%b %d, %Y')
+APPOINTMENT_TIME_FORMATS = ('%H:%M', '%H:%M:%S', '%I:%M %p', '%I:%M%p')
+
+def parse_with_formats(text, formats):
+    for fmt in formats:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            pass
+    return None
+
+def format_appointment(date_text, time_text):
+    # Build the same key for a slot whether it came from the API or the booking page,
+    # so switching between the two doesn't re-announce every slot
+    date_text = re.sub(r'(\d+)(st|nd|rd|th)\b', r'\1', date_text.strip())
+    time_text = time_text.strip()
+    date = parse_with_formats(date_text, APPOINTMENT_DATE_FORMATS)
+    time = parse_with_formats(time_text.upper(), APPOINTMENT_TIME_FORMATS)
+    if date is None or time is None:
+        logger.warning("Unrecognized appointment date or time: %s at %s", date_text, time_text)
+        return f"{date_text} at {time_text}"
+    return f"{date:%A, %Y-%m-%d} at {time:%H:%M}"
+
+def get_system_info():
+    # Collected once when the script starts so failed driver launches don't fork Chrome again
+    info = {}
+    try:
+        info['os'] = f"{platform.system()} {platform.version()}"
+        info['python'] = platform.python_version()
+        info['architecture'] = platform.architecture()
+        
+        # Try to get Chrome version
+        try:
+            chrome_path = r"C:\Program Files\Google\Chrome\Application\chrome.exe"
+            if os.path.exists(chrome_path):
+                info['chrome'] = subprocess.check_output([chrome_path, "--version"], timeout=10).decode().strip()
+        except Exception as chrome_error:
+            logger.error("Could not determine Chrome version: %s", chrome_error)
+    except Exception as info_error:
+        logger.error("Error getting system information: %s", info_error)
+    return info
+
+# Filled in by get_system_info() when the script starts
+system_info = {}
 
 class ICBCChecker:
-    def __init__(self):
+    # Locators for the login form
+    _LOGIN_FORM = (By.ID, 'mat-input-0')
+    _LOGIN_INPUTS = (By.CSS_SELECTOR, "input.mat-input-element")
+
+    # Locators for the search modal and results dialog
+    _BY_OFFICE_TAB = (By.CSS_SELECTOR, "app-search-modal mat-tab-header .mat-tab-label:nth-child(2)")
+    _LOCATION_INPUT = (By.CSS_SELECTOR, "app-search-modal mat-tab-body:nth-of-type(2) input[type=text]")
+    _LOCATION_OPTION = (By.CSS_SELECTOR, "mat-option span")
+    _RESULTS = (By.CSS_SELECTOR, "app-eligible-tests > div > div:nth-of-type(2)")
+
+    # Pairs every appointment time with the closest preceding date in a single call
+    _EXTRACT_APPOINTMENTS_JS = """
+        const pairs = [];
+        let date = '';
+        for (const el of arguments[0].querySelectorAll('div.appointment-date, div.appointment-time')) {
+            if (el.classList.contains('appointment-date')) {
+                date = el.innerText.trim();
+            } else {
+                pairs.push([date, el.innerText.trim()]);
+            }
+        }
+        return pairs;
+    """
+
+    def __init__(self, debugger_address=None):
         self.driver = None
-        self.setup_driver()
+        self.session = requests.Session()
+        self.token = None
+        self.debugger_address = debugger_address
+        self.uses = 0
+        # WebDriver isn't thread-safe; a timed-out check can still be running in its worker thread
+        self.lock = threading.Lock()
+        # Parallel office checks share one API token and must not log in concurrently
+        self.token_lock = threading.Lock()
+        # The browser is started by start_browser() or lazily on the first browser check
+        if debugger_address:
+            self.setup_driver()
+
+    @classmethod
+    def attach(cls, owner):
+        # Open another checker in a new tab of owner's browser instead of launching Chrome again.
+        # The owner must outlive its attached checkers: closing or recycling its browser closes
+        # their tabs too, and an attached checker can only reconnect once the owner has relaunched.
+        if not CHROME_DEBUG_PORT:
+            raise RuntimeError("CHROME_DEBUG_PORT must be set to attach to a running browser")
+        if not owner.driver or owner.debugger_address:
+            raise RuntimeError("Can only attach to a checker that has launched its own browser")
+        return cls(debugger_address=f"127.0.0.1:{CHROME_DEBUG_PORT}")
+
+    def launch_options(self):
+        chrome_options = Options()
+        chrome_options.add_argument('--headless=new')
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--window-size=1920,1080')
+        chrome_options.add_argument('--disable-extensions')
+        chrome_options.add_argument('--disable-infobars')
+        chrome_options.add_argument('--disable-notifications')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+        chrome_options.add_argument('--disable-gpu')
+        chrome_options.add_argument('--disable-features=Translate,MediaRouter')
+        
+        # Return from navigation on DOMContentLoaded; element waits gate the rest
+        chrome_options.page_load_strategy = 'eager'
+        
+        # Add experimental options
+        chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
+        chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
+        
+        # Skip loading images and notification prompts, only page text is read
+        chrome_options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+            'profile.default_content_setting_values.notifications': 2
+        })
+        
+        # Expose the DevTools endpoint so other checkers can attach to this browser
+        if CHROME_DEBUG_PORT:
+            chrome_options.add_argument(f'--remote-debugging-port={CHROME_DEBUG_PORT}')
+        return chrome_options
 
     def setup_driver(self):
         try:
-            # Set up Chrome options
-            chrome_options = Options()
-            chrome_options.add_argument('--headless=new')
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--window-size=1920,1080')
-            chrome_options.add_argument('--disable-extensions')
-            chrome_options.add_argument('--disable-infobars')
-            chrome_options.add_argument('--disable-notifications')
-            
-            # Add experimental options
-            chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
-            chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
+            # Set up Chrome options, attaching to a running browser if requested
+            if self.debugger_address:
+                chrome_options = Options()
+                chrome_options.add_experimental_option('debuggerAddress', self.debugger_address)
+                chrome_options.page_load_strategy = 'eager'
+            else:
+                chrome_options = self.launch_options()
             
-            # Initialize ChromeDriver with simple setup
+            # Initialize ChromeDriver, only hitting the driver manager on the first run
+            global driver_path
             logger.info("Initializing Chrome WebDriver...")
-            driver_manager = ChromeDriverManager()
-            driver_path = driver_manager.install()
-            
-            # Extract the actual chromedriver executable path
-            if 'chromedriver-win32' in driver_path:
-                driver_path = os.path.join(os.path.dirname(driver_path), 'chromedriver.exe')
-            elif not driver_path.endswith('.exe'):
-                driver_path = driver_path + '.exe'
+            if driver_path is None:
+                driver_manager = ChromeDriverManager()
+                resolved_path = driver_manager.install()
                 
-            logger.info(f"Using ChromeDriver at: {driver_path}")
+                # Extract the actual chromedriver executable path
+                if 'chromedriver-win32' in resolved_path:
+                    resolved_path = os.path.join(os.path.dirname(resolved_path), 'chromedriver.exe')
+                elif not resolved_path.endswith('.exe'):
+                    resolved_path = resolved_path + '.exe'
+                driver_path = resolved_path
+                
+            logger.info("Using ChromeDriver at: %s", driver_path)
             
             if not os.path.exists(driver_path):
                 raise FileNotFoundError(f"ChromeDriver not found at: {driver_path}")
             
-            # Create service with explicit path
+            # Create service with explicit path, discarding chromedriver's own log
             service = Service(
                 executable_path=driver_path,
-                log_path='chromedriver.log'
+                log_path=os.devnull
             )
             
             # Initialize the driver with service and options
@@ -123,46 +312,76 @@ class ICBCChecker:
                 service=service,
                 options=chrome_options
             )
+            if self.debugger_address:
+                self.driver.switch_to.new_window('tab')
+            
+            # Block static resources the checker never inspects
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {
+                'urls': ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.svg', '*.woff*']
+            })
             
-            # Set window size and wait timeout
+            # Set window size, page timeouts and wait timeout
             self.driver.set_window_size(1920, 1080)
+            self.driver.set_page_load_timeout(15)
+            self.driver.set_script_timeout(10)
             self.wait = WebDriverWait(self.driver, 20)
+            self.uses = 0
             logger.info("Chrome WebDriver initialized successfully in headless mode")
             
         except Exception as e:
-            logger.error(f"Failed to initialize Chrome WebDriver: {str(e)}")
+            logger.error("Failed to initialize Chrome WebDriver: %s", e)
             logger.error("Stack trace:", exc_info=True)
-            # Log additional diagnostic information
-            try:
-                import platform
-                logger.error(f"System information:")
-                logger.error(f"OS: {platform.system()} {platform.version()}")
-                logger.error(f"Python version: {platform.python_version()}")
-                logger.error(f"Architecture: {platform.architecture()}")
-                
-                # Try to get Chrome version
-                import subprocess
-                try:
-                    chrome_path = r"C:\Program Files\Google\Chrome\Application\chrome.exe"
-                    if os.path.exists(chrome_path):
-                        version = subprocess.check_output([chrome_path, "--version"]).decode().strip()
-                        logger.error(f"Chrome version: {version}")
-                except Exception as chrome_error:
-                    logger.error(f"Could not determine Chrome version: {str(chrome_error)}")
-            except Exception as info_error:
-                logger.error(f"Error getting system information: {str(info_error)}")
+            # Log the system information collected at startup
+            logger.error("System information: %s", system_info)
             raise
 
+    def restart_driver(self):
+        # Throw away a crashed or stale browser and launch a fresh one
+        try:
+            if self.driver:
+                if self.debugger_address:
+                    self.driver.close()
+                self.driver.quit()
+        except Exception as e:
+            logger.error("Error closing WebDriver: %s", e)
+        self.driver = None
+        self.setup_driver()
+
+    def start_browser(self):
+        with self.lock:
+            self.setup_driver()
+            self.login()
+
+    def navigate(self, url):
+        # Stop a slow page load instead of hanging; the element waits take over from here
+        try:
+            self.driver.get(url)
+        except TimeoutException:
+            logger.warning("Page load timed out, stopping load of %s", url)
+            self.driver.execute_script("window.stop();")
+
+    def fast_type(self, element, text):
+        # Set the value in one call instead of sending a key event per character,
+        # then fire an input event so Angular picks up the change
+        self.driver.execute_script(
+            "arguments[0].value = arguments[1];"
+            "arguments[0].dispatchEvent(new Event('input', {bubbles: true}));",
+            element, text
+        )
+
     def login(self):
         try:
             # Navigate to login page
-            self.driver.get('https://onlinebusiness.icbc.com/webdeas-ui/login;type=driver')
+            self.navigate(LOGIN_URL)
             logger.info("Navigated to login page")
             
-            # Wait for and fill in login fields
-            self.wait.until(EC.presence_of_element_located((By.ID, 'mat-input-0'))).send_keys(LAST_NAME)
-            self.wait.until(EC.presence_of_element_located((By.ID, 'mat-input-1'))).send_keys(LICENSE_NUMBER)
-            self.wait.until(EC.presence_of_element_located((By.ID, 'mat-input-2'))).send_keys(KEYWORD)
+            # Wait for the login form, then fetch all of its fields in one call
+            self.wait.until(EC.presence_of_element_located(self._LOGIN_FORM))
+            inputs = self.driver.find_elements(*self._LOGIN_INPUTS)
+            self.fast_type(inputs[0], LAST_NAME)
+            self.fast_type(inputs[1], LICENSE_NUMBER)
+            self.fast_type(inputs[2], KEYWORD)
             logger.info("Filled in login credentials")
             
             # Accept terms
@@ -178,66 +397,166 @@ class ICBCChecker:
             logger.info("Successfully logged in")
             return True
         except TimeoutException as e:
-            logger.error(f"Timeout during login: {str(e)}")
+            logger.error("Timeout during login: %s", e)
+            return False
+        except Exception as e:
+            logger.error("Login failed: %s", e)
+            return False
+
+    def api_login(self):
+        try:
+            response = self.session.put(API_LOGIN_URL, json={
+                'drvrLastName': LAST_NAME,
+                'licenceNumber': LICENSE_NUMBER,
+                'keyword': KEYWORD
+            }, timeout=20)
+            response.raise_for_status()
+            self.token = response.headers['Authorization']
+            logger.info("Successfully logged in to the booking API")
+            return True
+        except Exception as e:
+            logger.error("API login failed: %s", e)
+            self.token = None
             return False
+
+    def refresh_token(self, stale_token):
+        # Log in again unless another thread already replaced the stale token
+        with self.token_lock:
+            if self.token and self.token != stale_token:
+                return True
+            return self.api_login()
+
+    def check_availability_api(self, pos_id):
+        # Returns None when the API can't be used for this office
+        try:
+            token = self.token
+            if not token:
+                if not self.refresh_token(None):
+                    return None
+                token = self.token
+            
+            payload = {
+                'aPosID': int(pos_id),
+                'examType': ICBC_EXAM_TYPE,
+                'examDate': datetime.now().strftime("%Y-%m-%d"),
+                'ignoreReserveTime': False,
+                'prfDaysOfWeek': '[0,1,2,3,4,5,6]',
+                'prfPartsOfDay': '[0,1]',
+                'lastName': LAST_NAME,
+                'licenseNumber': LICENSE_NUMBER
+            }
+            response = self.session.post(API_APPOINTMENTS_URL, json=payload,
+                                         headers={'Authorization': token}, timeout=20)
+            
+            # Token expired, log in again and retry once
+            if response.status_code in (401, 403):
+                logger.info("API token expired, logging in again")
+                if not self.refresh_token(token):
+                    return None
+                response = self.session.post(API_APPOINTMENTS_URL, json=payload,
+                                             headers={'Authorization': self.token}, timeout=20)
+            response.raise_for_status()
+            
+            appointments = []
+            for slot in response.json():
+                appointment = format_appointment(slot['appointmentDt']['date'], slot['startTm'])
+                if len(ICBC_POS_IDS) > 1:
+                    appointment += office_suffix(pos_id)
+                appointments.append(appointment)
+                logger.info("Found appointment: %s", appointment)
+            
+            if not appointments:
+                logger.info("No available appointments returned by the API for office %s", pos_id)
+            return appointments
         except Exception as e:
-            logger.error(f"Login failed: {str(e)}")
+            logger.error("Error checking availability through the API for office %s: %s", pos_id, e)
+            return None
+
+    def check_availability_browser(self):
+        # Returns None when the check failed, the session could not be logged in or is still busy
+        if not self.lock.acquire(blocking=False):
+            logger.warning("Previous browser check is still running, skipping this check")
+            return None
+        try:
+            return self.run_browser_check()
+        finally:
+            self.lock.release()
+
+    def run_browser_check(self):
+        if not self.driver:
+            self.setup_driver()
+        
+        # Restart the browser periodically to bound Chrome's memory growth
+        if self.uses >= BROWSER_RECYCLE_AFTER:
+            self.recycle_driver()
+        self.uses += 1
+        
+        if not self.ensure_session():
+            return None
+        return self.check_availability()
+
+    def ensure_session(self):
+        # Reload the booking page and log in again only if the session has expired.
+        # The router redirects to the login page after DOMContentLoaded, so wait until
+        # either the redirect happens or the search modal shows up before deciding.
+        try:
+            self.navigate(BOOKING_URL)
+            self.wait.until(EC.any_of(
+                EC.url_contains('/login'),
+                EC.presence_of_element_located(self._BY_OFFICE_TAB)
+            ))
+            if '/login' in self.driver.current_url:
+                logger.info("Session expired, logging in again")
+                return self.login()
+            return True
+        except TimeoutException as e:
+            logger.error("Failed to restore session: %s", e)
             return False
+        except WebDriverException as e:
+            # Chrome crashed or the session is gone, start a new browser and log in again
+            logger.error("WebDriver session lost, restarting browser: %s", e)
+            self.restart_driver()
+            return self.login()
 
     def check_availability(self):
+        # Returns None when the check failed so it isn't mistaken for "no appointments"
         try:
             logger.info("Starting appointment availability check...")
             
-            # Wait for and click the "By office" tab using exact XPath
+            # Wait for and click the "By office" tab
             logger.info("Waiting for 'By office' tab to be present...")
-            tab_xpath = "/html/body/div/div/div/mat-dialog-container/app-search-modal/div/div/form/div[1]/mat-tab-group/mat-tab-header/div[2]/div/div/div[2]"
-            
             by_office_tab = self.wait.until(
-                EC.element_to_be_clickable((By.XPATH, tab_xpath))
+                EC.element_to_be_clickable(self._BY_OFFICE_TAB)
             )
             logger.info("Found 'By office' tab, clicking...")
             by_office_tab.click()
             logger.info("Clicked 'By office' tab successfully")
             
-            # Wait for and interact with the location input using exact XPath
+            # Wait for the location input to be present and clickable
             logger.info("Waiting for location input field...")
-            input_xpath = "/html/body/div/div[1]/div/mat-dialog-container/app-search-modal/div/div/form/div[1]/mat-tab-group/div/mat-tab-body[2]/div/div/mat-form-field/div/div[1]/div[3]/input"
-            
             location_input = self.wait.until(
-                EC.presence_of_element_located((By.XPATH, input_xpath))
-            )
-            
-            # Ensure input is clickable
-            self.wait.until(
-                EC.element_to_be_clickable((By.XPATH, input_xpath))
+                EC.element_to_be_clickable(self._LOCATION_INPUT)
             )
             
             logger.info("Found location input, clicking and entering location...")
             location_input.click()
-            location_name = "Richmond driver licensing (Lansdowne Centre mall)"
-            location_input.send_keys(location_name)
-            logger.info(f"Entered location: {location_name}")
-            
-            # Small wait for the dropdown to populate
-            time.sleep(1)
+            location_input.send_keys(ICBC_LOCATION_NAME)
+            logger.info("Entered location: %s", ICBC_LOCATION_NAME)
             
-            # Wait for and click the location option using exact XPath
+            # Wait for and click the location option, polling quickly so the
+            # option is picked up as soon as the dropdown populates
             logger.info("Waiting for location option to appear...")
-            option_xpath = "/html/body/div/div[2]/div/div/mat-option/span"
-            
-            richmond_option = self.wait.until(
-                EC.element_to_be_clickable((By.XPATH, option_xpath))
+            location_option = WebDriverWait(self.driver, 20, poll_frequency=0.2).until(
+                EC.element_to_be_clickable(self._LOCATION_OPTION)
             )
             logger.info("Found location option, clicking...")
-            richmond_option.click()
-            logger.info("Selected Richmond location successfully")
+            location_option.click()
+            logger.info("Selected location successfully")
             
-            # Wait for the results popup using exact XPath
+            # Wait for the results popup
             logger.info("Waiting for results popup...")
-            results_xpath = "/html/body/div/div[2]/div/mat-dialog-container/app-eligible-tests/div/div[2]"
-            
             results_container = self.wait.until(
-                EC.presence_of_element_located((By.XPATH, results_xpath))
+                EC.presence_of_element_located(self._RESULTS)
             )
             logger.info("Results popup found, looking for appointments...")
             
@@ -249,21 +568,17 @@ class ICBCChecker:
                     logger.info("No appointments available message found")
                     return []
                 
-                # Look for appointment slots
-                available_slots = results_container.find_elements(By.XPATH, ".//div[contains(@class, 'appointment-time')]")
+                # Read every appointment slot and its date in one round trip
+                pairs = self.driver.execute_script(self._EXTRACT_APPOINTMENTS_JS, results_container)
                 appointments = []
                 
-                for slot in available_slots:
-                    try:
-                        # Find the associated date (looking within the current context)
-                        date_element = slot.find_element(By.XPATH, "./preceding::div[contains(@class, 'appointment-date')][1]")
-                        date_text = date_element.text
-                        time_text = slot.text
-                        appointment = f"{date_text} at {time_text}"
-                        appointments.append(appointment)
-                        logger.info(f"Found appointment: {appointment}")
-                    except Exception as e:
-                        logger.warning(f"Failed to parse an appointment slot: {str(e)}")
+                for date_text, time_text in pairs:
+                    if not date_text:
+                        logger.warning("Failed to find a date for appointment slot: %s", time_text)
+                        continue
+                    appointment = format_appointment(date_text, time_text)
+                    appointments.append(appointment)
+                    logger.info("Found appointment: %s", appointment)
                 
                 if not appointments:
                     logger.info("No available appointments found in the results")
@@ -275,108 +590,193 @@ class ICBCChecker:
                 return appointments
                 
             except Exception as e:
-                logger.error(f"Error parsing results: {str(e)}")
-                return []
+                logger.error("Error parsing results: %s", e)
+                return None
             
         except Exception as e:
-            logger.error(f"Error checking availability: {str(e)}")
+            logger.error("Error checking availability: %s", e)
             logger.error("Stack trace:", exc_info=True)
-            return []
+            return None
+
+    def recycle_driver(self):
+        logger.info("Recycling WebDriver after %d checks", self.uses)
+        self.restart_driver()
 
     def close(self):
+        self.session.close()
         try:
             if hasattr(self, 'driver') and self.driver:
+                # An attached session only owns its tab, the shared browser keeps running
+                if self.debugger_address:
+                    self.driver.close()
                 self.driver.quit()
                 logger.info("WebDriver closed successfully")
         except Exception as e:
-            logger.error(f"Error closing WebDriver: {str(e)}")
+            logger.error("Error closing WebDriver: %s", e)
+
+def load_state():
+    try:
+        with open(STATE_FILE, encoding='utf-8') as f:
+            return frozenset(json.load(f))
+    except FileNotFoundError:
+        return frozenset()
+    except Exception as e:
+        logger.error("Failed to load saved appointments: %s", e)
+        return frozenset()
+
+def save_state(appointments):
+    # Write to a temporary file and swap it in so a crash can't leave a partial file
+    try:
+        tmp_file = STATE_FILE + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(sorted(appointments), f)
+        os.replace(tmp_file, STATE_FILE)
+    except Exception as e:
+        logger.error("Failed to save appointments: %s", e)
+
+async def fetch_appointments():
+    # Returns the appointments found and the offices that couldn't be checked.
+    # Appointments are None when nothing could be checked at all.
+    # Every office is checked concurrently through the booking API. The browser is only
+    # used as a fallback with a single office, the one it searches for by name.
+    loop = asyncio.get_running_loop()
+    if not ICBC_POS_IDS:
+        return await loop.run_in_executor(None, checker.check_availability_browser), []
+    
+    # Log in up front so the parallel requests share one token
+    if checker.token or await loop.run_in_executor(None, checker.refresh_token, None):
+        results = await asyncio.gather(*(
+            loop.run_in_executor(None, checker.check_availability_api, pos_id)
+            for pos_id in ICBC_POS_IDS
+        ))
+    else:
+        results = [None] * len(ICBC_POS_IDS)
+    failed_offices = [pos_id for pos_id, result in zip(ICBC_POS_IDS, results) if result is None]
+    
+    if failed_offices and len(ICBC_POS_IDS) == 1:
+        logger.warning("Falling back to browser check")
+        appointments = await loop.run_in_executor(None, checker.check_availability_browser)
+        return appointments, (failed_offices if appointments is None else [])
+    
+    if len(failed_offices) == len(ICBC_POS_IDS):
+        return None, failed_offices
+    return [appointment for result in results if result is not None for appointment in result], failed_offices
 
 @client.event
 async def on_ready():
-    logger.info(f'Discord bot logged in as {client.user}')
+    global checker, channel, previous_appointments
+    logger.info("Discord bot logged in as %s", client.user)
+    
+    # Resolve the notification channel once, fetching it if it isn't cached yet
+    if channel is None:
+        channel = client.get_channel(DISCORD_CHANNEL_ID)
+        if channel is None:
+            try:
+                channel = await client.fetch_channel(DISCORD_CHANNEL_ID)
+            except discord.DiscordException as e:
+                logger.error("Failed to fetch Discord channel %s: %s", DISCORD_CHANNEL_ID, e)
+                return
+    
+    # Create the checker once and reuse it for every check
+    if checker is None:
+        previous_appointments = load_state()
+        checker = ICBCChecker()
+        atexit.register(checker.close)
+        
+        # Warm up the browser off the event loop; if Chrome fails to launch, later checks retry
+        if not ICBC_POS_IDS:
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, checker.start_browser)
+            except Exception as e:
+                logger.error("Failed to start browser: %s", e)
+                try:
+                    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    await channel.send(ERROR_TMPL.format(time=current_time))
+                except Exception as notify_error:
+                    logger.error("Failed to send error notification: %s", notify_error)
     current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
     # Send startup notification
     try:
-        channel = client.get_channel(DISCORD_CHANNEL_ID)
-        if channel:
-            startup_message = f"🟢 **ICBC Appointment Checker Started** - {current_time}\n\n"
-            startup_message += f"I'll check for appointments every {CHECK_INTERVAL} minutes.\n"
-            startup_message += "I'll notify you about:\n"
-            startup_message += "• New appointments when they become available\n"
-            startup_message += "• Current appointment status on each check\n"
-            startup_message += "• Any errors that occur during checking"
-            await channel.send(startup_message)
+        startup_message = f"🟢 **ICBC Appointment Checker Started** - {current_time}\n\n"
+        startup_message += f"I'll check for appointments every {CHECK_INTERVAL} minutes.\n"
+        startup_message += "I'll notify you about:\n"
+        startup_message += "• New appointments when they become available\n"
+        startup_message += "• Current appointment status on each check\n"
+        startup_message += "• Any errors that occur during checking"
+        await channel.send(startup_message)
     except Exception as e:
-        logger.error(f"Failed to send startup notification: {str(e)}")
+        logger.error("Failed to send startup notification: %s", e)
     
-    check_appointments.start()
+    if not check_appointments.is_running():
+        check_appointments.start()
 
 @tasks.loop(minutes=CHECK_INTERVAL)
 async def check_appointments():
     global previous_appointments
-    checker = None
     
     try:
-        checker = ICBCChecker()
-        if checker.login():
-            appointments = checker.check_availability()
+        # Run the blocking checks in worker threads so the Discord heartbeat keeps running
+        appointments, failed_offices = await asyncio.wait_for(fetch_appointments(), timeout=CHECK_TIMEOUT)
+        if appointments is not None:
+            # Convert appointments list to a frozenset for comparison
+            checked_appointments = frozenset(appointments)
+            location = LOCATION_LABEL
             
-            # Convert appointments list to set for comparison
-            current_appointments = set(appointments)
+            # Keep what was known about offices that couldn't be checked so they aren't
+            # re-announced later, but only report on the offices that were checked
+            carried_over = frozenset()
+            if failed_offices:
+                failed_suffixes = tuple(office_suffix(pos_id) for pos_id in failed_offices)
+                carried_over = frozenset(apt for apt in previous_appointments if apt.endswith(failed_suffixes))
+                location = ", ".join(f"office {pos_id}" for pos_id in ICBC_POS_IDS if pos_id not in failed_offices)
+            current_appointments = checked_appointments | carried_over
             
-            # Get the Discord channel
-            channel = client.get_channel(DISCORD_CHANNEL_ID)
-            if channel:
-                current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                
-                # Find new appointments
-                new_appointments = current_appointments - previous_appointments
-                
-                if new_appointments:
-                    # New appointments found
-                    message = "🚨 **New ICBC Road Test Appointments Available!**\n\n"
-                    message += "\n".join([f"📅 {apt}" for apt in new_appointments])
-                    message += "\n\nBook now at: https://onlinebusiness.icbc.com/webdeas-ui/booking"
-                    await channel.send(message)
-                    logger.info(f"Sent notification for {len(new_appointments)} new appointments")
-                elif not current_appointments:
-                    # No appointments available
-                    message = f"⚠️ **ICBC Appointment Check Update** - {current_time}\n\n"
-                    message += "No appointments currently available at Richmond (Lansdowne Centre mall).\n"
-                    message += "I'll keep checking and notify you when appointments become available."
-                    await channel.send(message)
-                    logger.info("Sent notification for no available appointments")
-                else:
-                    # Appointments exist but no new ones
-                    message = f"ℹ️ **ICBC Appointment Check Update** - {current_time}\n\n"
-                    message += "Currently available appointments:\n"
-                    message += "\n".join([f"📅 {apt}" for apt in current_appointments])
-                    message += "\n\nNo new appointments since last check."
-                    await channel.send(message)
-                    logger.info("Sent notification for existing appointments")
+            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            
+            # Find new appointments
+            new_appointments = checked_appointments - previous_appointments
+            changed = current_appointments != previous_appointments
+            
+            if new_appointments:
+                # New appointments found
+                message = NEW_TMPL.format(body="\n".join(f"📅 {apt}" for apt in new_appointments))
+                await channel.send(message)
+                logger.info("Sent notification for %d new appointments", len(new_appointments))
+            elif not checked_appointments:
+                # No appointments available
+                message = NO_APPT_TMPL.format(time=current_time, location=location)
+                await channel.send(message)
+                logger.info("Sent notification for no available appointments")
+            else:
+                # Appointments exist but no new ones
+                message = EXISTING_TMPL.format(
+                    time=current_time,
+                    body="\n".join(f"📅 {apt}" for apt in checked_appointments)
+                )
+                await channel.send(message)
+                logger.info("Sent notification for existing appointments")
             
             # Update previous appointments
+            if changed:
+                save_state(current_appointments)
             previous_appointments = current_appointments
+        
+        if failed_offices:
+            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            offices = ", ".join(f"office {pos_id}" for pos_id in failed_offices)
+            await channel.send(OFFICE_ERROR_TMPL.format(time=current_time, offices=offices))
+            logger.info("Sent notification for failed offices: %s", offices)
     
     except Exception as e:
-        logger.error(f"Error in check_appointments: {str(e)}")
+        logger.error("Error in check_appointments: %s", e)
         logger.error("Stack trace:", exc_info=True)
         
         try:
-            channel = client.get_channel(DISCORD_CHANNEL_ID)
-            if channel:
-                current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                error_message = f"❌ **ICBC Checker Error** - {current_time}\n\n"
-                error_message += "Failed to check appointments.\n"
-                error_message += "I'll try again in the next scheduled check."
-                await channel.send(error_message)
+            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            await channel.send(ERROR_TMPL.format(time=current_time))
         except Exception as notify_error:
-            logger.error(f"Failed to send error notification: {str(notify_error)}")
-    
-    finally:
-        if checker:
-            checker.close()
+            logger.error("Failed to send error notification: %s", notify_error)
 
 if __name__ == "__main__":
     # Verify required environment variables
@@ -384,8 +784,12 @@ if __name__ == "__main__":
     missing_vars = [var for var in required_vars if not os.getenv(var)]
     
     if missing_vars:
-        logger.error(f"Missing required environment variables: {', '.join(missing_vars)}")
+        logger.error("Missing required environment variables: %s", ', '.join(missing_vars))
         exit(1)
         
+    system_info = get_system_info()
+    logger.info("System information: %s", system_info)
+    
     logger.info("Starting ICBC appointment checker")
-    client.run(DISCORD_TOKEN) 
\ No newline at end of file
+    # discord.py logs through the root handlers above instead of adding its own
+    client.run(DISCORD_TOKEN, log_handler=None) 
\ No newline at end of file